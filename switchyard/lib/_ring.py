@@ -0,0 +1,76 @@
+import threading
+from collections import deque
+from queue import Empty
+
+
+class MPSCQueue(object):
+    '''
+    A multi-producer, single-consumer queue used to pass received
+    packets from the low-level device threads to user code.
+
+    queue.Queue takes a mutex on every put and get; with one producer
+    thread per device plus the user thread that adds up to a lot of
+    contended lock traffic on busy interfaces.  This class relies on
+    the fact that deque append and popleft are atomic under the GIL:
+    a put is just an append, plus an event notification to wake a
+    blocked consumer -- but only when the event flag is clear, i.e.
+    when the consumer found the deque empty and may be sleeping.
+    Event.set takes the event's internal lock, so skipping it while
+    the flag is already set keeps the steady-state busy path free of
+    any locking.  Only the single consumer ever blocks (on the
+    event), which is why this is strictly a multi-producer,
+    *single*-consumer structure.
+
+    The interface is the subset of queue.Queue that LLNetReal uses:
+    put, get (raising queue.Empty on timeout), empty and qsize.
+    '''
+    def __init__(self):
+        self._queue = deque()
+        self._nonempty = threading.Event()
+
+    def put(self, item):
+        self._queue.append(item)
+        # only notify when the flag is clear (consumer drained the
+        # deque and may be about to sleep); set() takes a lock, so
+        # avoiding the redundant call keeps busy puts lock-free
+        if not self._nonempty.is_set():
+            self._nonempty.set()
+
+    def get(self, timeout=None):
+        '''
+        Remove and return the oldest item in the queue, blocking for
+        up to timeout seconds (forever if timeout is None).  Raises
+        queue.Empty if no item shows up in time.
+        '''
+        popleft = self._queue.popleft
+        while True:
+            try:
+                return popleft()
+            except IndexError:
+                pass
+            # nothing there; clear the event and check once more in
+            # case a producer slipped in an item just before the
+            # clear, then wait to be woken by the next put.
+            self._nonempty.clear()
+            try:
+                return popleft()
+            except IndexError:
+                pass
+            if not self._nonempty.wait(timeout):
+                raise Empty
+
+    def get_nowait(self):
+        '''
+        Remove and return the oldest item in the queue without
+        blocking.  Raises queue.Empty if there is none.
+        '''
+        try:
+            return self._queue.popleft()
+        except IndexError:
+            raise Empty from None
+
+    def empty(self):
+        return not self._queue
+
+    def qsize(self):
+        return len(self._queue)
@@ -25,6 +25,15 @@ def log_debug(s):
     '''Convenience function for debugging message.'''
     logging.debug("{}".format(s))
 
+def debug_enabled():
+    '''
+    True if debug-level messages would actually be emitted.  Hot
+    paths should check this before constructing an expensive
+    message to pass to log_debug, since the message argument is
+    evaluated regardless of the configured log level.
+    '''
+    return logging.getLogger().isEnabledFor(logging.DEBUG)
+
 def log_warn(s):
     '''Convenience function for warning message.'''
     with magenta():
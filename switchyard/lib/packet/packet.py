@@ -30,14 +30,14 @@ class Packet(object):
         '''
         Returns serialized bytes object representing all headers/
         payloads in this packet'''
-        rawlist = []
+        raw = b''
         i = len(self._headers)-1
         while i >= 0:
-            self._headers[i].pre_serialize(b''.join(rawlist), self, i)
-            rawlist.insert(0, self._headers[i].to_bytes())
+            self._headers[i].pre_serialize(raw, self, i)
+            raw = self._headers[i].to_bytes() + raw
             i -= 1
-        self._raw = b''.join(rawlist)
-        return self._raw
+        self._raw = raw
+        return raw
 
     def _parse(self, raw, next_cls):
         '''
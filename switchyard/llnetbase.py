@@ -54,6 +54,7 @@ class LLNetBase(metaclass=ABCMeta):
     def __init__(self, name=None):
         self._devupdown_callback = None
         self._devinfo = {} # dict(str -> Interface)
+        self._ifnum_to_devname = None # lazily built index; see _lookup_devname
 
     def set_devupdown_callback(self, callback):
         '''
@@ -83,6 +84,7 @@ class LLNetBase(metaclass=ABCMeta):
         '''
         if interface.name not in self._devinfo:
             self._devinfo[interface.name] = interface
+            self._ifnum_to_devname = None
             if self._devupdown_callback:
                 self._devupdown_callback(interface, 'up')
         else:
@@ -172,11 +174,21 @@ class LLNetBase(metaclass=ABCMeta):
     @abstractmethod
     def send_packet(self, output_port, packet):
         '''
-        Send a packet out the given output port/interface.  
+        Send a packet out the given output port/interface.
         Returns None.
         '''
         pass
 
+    def send_packets(self, output_port, packets):
+        '''
+        Send a sequence of packets out the given output port/interface.
+        Equivalent to calling send_packet once per packet, but
+        implementations may amortize per-send overhead across the
+        whole sequence.  Returns None.
+        '''
+        for packet in packets:
+            self.send_packet(output_port, packet)
+
     @abstractmethod
     def shutdown(self):
         pass
@@ -186,8 +198,14 @@ class LLNetBase(metaclass=ABCMeta):
         pass
 
     def _lookup_devname(self, ifnum):
-        for devname,iface in self._devinfo.items():
-            if iface.ifnum == ifnum:
-                return devname
-        raise KeyError("No device has ifnum {}".format(ifnum)) 
+        # build the reverse index on first use rather than scanning
+        # the interface dict linearly on every lookup; intf_up
+        # invalidates it when a new interface is registered
+        if self._ifnum_to_devname is None:
+            self._ifnum_to_devname = {iface.ifnum: devname
+                for devname,iface in self._devinfo.items()}
+        try:
+            return self._ifnum_to_devname[ifnum]
+        except KeyError:
+            raise KeyError("No device has ifnum {}".format(ifnum)) from None
 
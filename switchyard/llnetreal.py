@@ -2,12 +2,12 @@ import sys
 import argparse
 import os
 import signal
-import re
-import subprocess
 from time import time as now
 import threading
+import selectors
 import textwrap
-from queue import Queue,Empty
+from collections import deque
+from queue import Empty
 import socket
 
 from psutil import net_if_addrs
@@ -15,43 +15,83 @@ from psutil import net_if_addrs
 from .lib.address import *
 from .lib.packet import *
 from .lib.exceptions import Shutdown, NoPackets
+from .lib._ring import MPSCQueue
 from .lib.interface import Interface, InterfaceType
-from .lib.logging import setup_logging, log_info, log_debug, log_warn, log_failure
+from .lib.logging import setup_logging, log_info, log_debug, log_warn, log_failure, debug_enabled
 from .importcode import import_or_die
 from .textcolor import *
 
 from .pcapffi import *
 from .llnetbase import LLNetBase, ReceivedPacket, _start_usercode
 
-_dlt_to_decoder = {}
-_dlt_to_decoder[Dlt.DLT_EN10MB] = lambda raw: Packet(raw, first_header=Ethernet)
-_dlt_to_decoder[Dlt.DLT_NULL] = lambda raw: Packet(raw, first_header=Null)
+# decoders indexed by integer datalink type value (DLT_NULL == 0,
+# DLT_EN10MB == 1); a flat tuple indexed by int avoids enum hashing
+# on lookup
+_dlt_to_decoder = (
+    lambda raw: Packet(raw, first_header=Null),      # Dlt.DLT_NULL
+    lambda raw: Packet(raw, first_header=Ethernet),  # Dlt.DLT_EN10MB
+)
+
+def _decoder_for_dlt(dlt):
+    '''
+    Return the packet decoder for a datalink type, or None if we
+    don't know how to parse that encapsulation.
+    '''
+    try:
+        return _dlt_to_decoder[dlt.value]
+    except (AttributeError, IndexError, TypeError):
+        return None
 
 class LLNetReal(LLNetBase):
     '''
     A class that represents a collection of network devices
     on which packets can be received and sent.
     '''
-    def __init__(self, devlist, name=None):
+    _instance = None        # most recently created net object; the
+    _sig_registered = False # signal trampoline dispatches to it
+
+    def __init__(self, devlist, name=None, rx_cpu=None):
         LLNetBase.__init__(self)
-        signal.signal(signal.SIGINT, self._sig_handler)
-        signal.signal(signal.SIGTERM, self._sig_handler)
-        signal.signal(signal.SIGHUP, self._sig_handler)
-        signal.signal(signal.SIGUSR1, self._sig_handler)
-        signal.signal(signal.SIGUSR2, self._sig_handler)
+        # CPU to pin the receive dispatcher thread to; None (the
+        # default) leaves placement to the OS scheduler
+        self._rx_cpu = rx_cpu
+        # handlers are only installed on the first instantiation; the
+        # static trampoline forwards signals to whichever instance is
+        # current, so re-registering per object is unnecessary work
+        LLNetReal._instance = self
+        if not LLNetReal._sig_registered:
+            signal.signal(signal.SIGINT, LLNetReal._sig_trampoline)
+            signal.signal(signal.SIGTERM, LLNetReal._sig_trampoline)
+            signal.signal(signal.SIGHUP, LLNetReal._sig_trampoline)
+            signal.signal(signal.SIGUSR1, LLNetReal._sig_trampoline)
+            signal.signal(signal.SIGUSR2, LLNetReal._sig_trampoline)
+            LLNetReal._sig_registered = True
 
         self._devs = devlist 
         self._devinfo = self._assemble_devinfo()
         self._pcaps = {}
         self._localsend = {}
-        self._pktqueue = Queue()
+        self._pktqueue = MPSCQueue()
+        self._recvbatch = deque()
+        self._wakepipe = os.pipe()
         self._threads = []
         self._make_pcaps()
         log_info("Using network devices: {}".format(' '.join(self._devs)))
         for devname, intf in self._devinfo.items():
             log_debug("{}: {}".format(devname, str(intf)))
 
-        LLNetReal.running = True
+        # specialize the receive path: when every device shares one
+        # decoder (the common all-Ethernet case), bind the
+        # single-decoder variant of recv_packet on this instance so
+        # the per-packet decoder indirection drops out of the loop
+        decoders = set(self._decoders.values())
+        if len(decoders) == 1 and None not in decoders:
+            self._single_decoder = decoders.pop()
+            self.recv_packet = self._recv_packet_single
+
+        # per-instance flag; plain attribute loads/stores are atomic
+        # under the GIL, so threads can check it without locking
+        self._running = True
         self._spawn_threads()
 
         if name:
@@ -67,16 +107,21 @@ class LLNetReal(LLNetBase):
     def testmode(self):
         return False
 
+    @property
+    def running(self):
+        return self._running
+
     def shutdown(self):
         '''
         Should be called by Switchyard user code when a network object is
         being shut down.  (This method cleans up internal threads and network
         interaction objects.)
         '''
-        if not LLNetReal.running:
+        if not self._running:
             return
 
-        LLNetReal.running = False
+        self._running = False
+        self._wake_dispatcher()
         log_debug("Joining threads for shutdown")
         for t in self._threads:
             t.join()
@@ -85,15 +130,28 @@ class LLNetReal(LLNetBase):
             pdev.close()
         for rdev in self._localsend.values():
             rdev.close()
+        for fd in self._wakepipe:
+            os.close(fd)
         log_debug("Done cleaning up")
 
     def _spawn_threads(self):
         '''
-        Internal method.  Creates threads to handle low-level
-        network receive.
+        Internal method.  Creates thread(s) to handle low-level
+        network receive.  All devices with a selectable file
+        descriptor are serviced by a single dispatcher thread;
+        any device without one gets a dedicated thread as a
+        fallback.
         '''
+        seldevs = {}
         for devname,pdev in self._pcaps.items():
-            t = threading.Thread(target=LLNetReal._low_level_dispatch, args=(pdev, devname, self._pktqueue))
+            if pdev.fd >= 0:
+                seldevs[devname] = pdev
+            else:
+                t = threading.Thread(target=self._low_level_dispatch, args=(pdev, devname, self._decoders[devname], self._pktqueue))
+                t.start()
+                self._threads.append(t)
+        if seldevs:
+            t = threading.Thread(target=self._dispatch_thread_entry, args=(seldevs,))
             t.start()
             self._threads.append(t)
 
@@ -109,30 +167,35 @@ class LLNetReal(LLNetBase):
                 devtype[p.name] = InterfaceType.Loopback
             else:
                 if sys.platform == 'linux':
-                    st,output = subprocess.getstatusoutput(["iwconfig", p.name])
-                    if "no wireless extensions" in output:
-                        devtype[p.name] = InterfaceType.Wired
-                    else:
+                    # sysfs exposes a wireless/ subdirectory for
+                    # wireless devices; checking for it avoids
+                    # forking an iwconfig subprocess per device
+                    if os.path.isdir("/sys/class/net/{}/wireless".format(p.name)):
                         devtype[p.name] = InterfaceType.Wireless
+                    else:
+                        devtype[p.name] = InterfaceType.Wired
                 elif sys.platform == 'darwin':
                     devtype[p.name] = InterfaceType.Unknown
                 else:
                     devtype[p.name] = InterfaceType.Unknown
 
+        if sys.platform == 'darwin':
+            layer2addrfam = socket.AddressFamily.AF_LINK
+        elif sys.platform == 'linux':
+            layer2addrfam = socket.AddressFamily.AF_PACKET
+        else:
+            raise RuntimeException("Platform not supported")
+
         devinfo = {}
         ifinfo = net_if_addrs()
+        # one netlink dump for all interface indexes rather than one
+        # if_nametoindex query per device
+        ifnums = dict((name,idx) for idx,name in socket.if_nameindex())
         for devname in self._devs:
             ifaddrs = ifinfo.get(devname, None)
             if ifaddrs is None:
                 log_warn("Address info for interface {} not found! (skipping)".format(devname))
 
-            if sys.platform == 'darwin':
-                layer2addrfam = socket.AddressFamily.AF_LINK
-            elif sys.platform == 'linux':
-                layer2addrfam = socket.AddressFamily.AF_PACKET
-            else:
-                raise RuntimeException("Platform not supported")
-
             macaddr = "00:00:00:00:00:00"
             ipaddr = mask = "0.0.0.0"
             for addrinfo in ifaddrs:
@@ -142,7 +205,9 @@ class LLNetReal(LLNetBase):
                 elif addrinfo.family == layer2addrfam:
                     macaddr = EthAddr(addrinfo.address)
 
-            ifnum = socket.if_nametoindex(devname)
+            ifnum = ifnums.get(devname, None)
+            if ifnum is None:
+                ifnum = socket.if_nametoindex(devname)
             devinfo[devname] = Interface(devname, macaddr, ipaddr, netmask=mask, ifnum=ifnum, iftype=devtype[devname])
         return devinfo
 
@@ -150,15 +215,33 @@ class LLNetReal(LLNetBase):
         '''
         Internal method.  Create libpcap devices
         for every network interface we care about and
-        set them in non-blocking mode.
+        set them in non-blocking mode.  The packet decoder for each
+        device is resolved once here (the datalink type is invariant
+        for an open device) so the receive path doesn't need to look
+        it up per packet.
         '''
         self._pcaps = {}
+        self._decoders = {}
         for devname,intf in self._devinfo.items():
             if intf.iftype == InterfaceType.Loopback:
                 senddev = _RawSocket(devname, protocol=IPProtocol.UDP)
                 self._localsend[devname] = senddev
-            pdev = PcapLiveDevice(devname) 
+            pdev = PcapLiveDevice(devname)
             self._pcaps[devname] = pdev
+            decoder = _decoder_for_dlt(pdev.dlt)
+            if decoder is None:
+                log_warn("Device {} has unparseable encapsulation {}; packets received on it will be dropped".format(devname, pdev.dlt))
+            self._decoders[devname] = decoder
+
+    @staticmethod
+    def _sig_trampoline(signum, stack):
+        '''
+        Installed once as the process signal handler; forwards the
+        signal to the current net object, if any.
+        '''
+        inst = LLNetReal._instance
+        if inst is not None:
+            inst._sig_handler(signum, stack)
 
     def _sig_handler(self, signum, stack):
         '''
@@ -166,28 +249,115 @@ class LLNetReal(LLNetBase):
         '''
         log_debug("Got SIGINT.")
         if signum == signal.SIGINT:
-            LLNetReal.running = False
+            self._running = False
+            self._wake_dispatcher()
             if self._pktqueue.qsize() == 0:
                 # put dummy pkt in queue to unblock a 
                 # possibly stuck user thread
                 self._pktqueue.put( (None,None,None) )
 
-    @staticmethod
-    def _low_level_dispatch(pcapdev, devname, pktqueue):
+    def _dispatch_thread_entry(self, devs):
+        '''
+        Internal method.  Thread target for the dispatcher: applies
+        scheduling tweaks for the thread, then runs the dispatch loop.
+        '''
+        self._tune_dispatcher_thread()
+        self._selector_dispatch(devs)
+
+    def _tune_dispatcher_thread(self):
+        '''
+        Internal method.  Best effort: if the user asked for it by
+        passing rx_cpu to the constructor, pin the calling
+        (dispatcher) thread to that CPU so it keeps its cache warm
+        instead of migrating between cores.  Also raise the thread's
+        scheduling priority so packet pickup isn't delayed behind
+        ordinary work.  Both knobs are Linux-specific and may need
+        privileges; failures are logged and ignored.
+        '''
+        if self._rx_cpu is not None:
+            try:
+                os.sched_setaffinity(0, {self._rx_cpu})
+            except (AttributeError, OSError) as e:
+                log_debug("Couldn't pin dispatcher thread: {}".format(e))
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)
+        except (AttributeError, OSError, PermissionError) as e:
+            log_debug("Couldn't raise dispatcher thread priority: {}".format(e))
+
+    def _wake_dispatcher(self):
+        '''
+        Internal method.  Wake the dispatcher thread out of its
+        blocking select so that it notices we are shutting down.
+        '''
+        try:
+            os.write(self._wakepipe[1], b'\x00')
+        except OSError:
+            pass
+
+    def _selector_dispatch(self, devs):
+        '''
+        Thread entrypoint for low-level receive and dispatch across
+        all pcap devices that have a selectable file descriptor.
+        One thread blocks on a single selector (epoll on Linux)
+        rather than one thread blocking per device, so the thread
+        count stays constant no matter how many devices are in use.
+        The read end of the wake pipe is part of the selector set, so
+        the thread sleeps indefinitely when the network is idle and
+        is prodded awake at shutdown; there are no timeout-driven
+        wakeups.
+        '''
+        sel = selectors.DefaultSelector()
+        wakefd = self._wakepipe[0]
+        sel.register(wakefd, selectors.EVENT_READ, None)
+        for devname,pdev in devs.items():
+            sel.register(pdev.fd, selectors.EVENT_READ,
+                         (devname,pdev,self._decoders[devname]))
+
+        # bind hot lookups to locals; LOAD_FAST is measurably cheaper
+        # than repeated attribute lookups in a per-wakeup loop
+        select = sel.select
+        enqueue = self._pktqueue.put
+        while self._running:
+            for key,mask in select():
+                if key.data is None:
+                    # shutdown wakeup; drain the pipe and let the
+                    # loop condition decide whether to exit
+                    os.read(wakefd, 1024)
+                    continue
+                devname,pdev,decoder = key.data
+                # the device is readable, so collect whatever it has
+                # without blocking (devices are in non-blocking mode)
+                batch = pdev.recv_packet_batch(max_packets=64, timeout=0)
+                if batch:
+                    enqueue( (devname,decoder,batch) )
+        sel.close()
+
+        log_debug("Dispatcher thread exiting")
+        for devname,pdev in devs.items():
+            stats = pdev.stats()
+            log_debug("Final device statistics {}: {} received, {} dropped, {} dropped/if".format(devname, stats.ps_recv, stats.ps_drop, stats.ps_ifdrop))
+
+    def _low_level_dispatch(self, pcapdev, devname, decoder, pktqueue):
         '''
         Thread entrypoint for doing low-level receive and dispatch
-        for a single pcap device.
+        for a single pcap device.  Only used as a fallback for
+        devices that can't be handled by the selector-based
+        dispatcher thread.
         '''
-        while LLNetReal.running:
+        recv_batch = pcapdev.recv_packet_batch
+        enqueue = pktqueue.put
+        while self._running:
             # a non-zero timeout value is ok here; this is an
             # independent thread that handles input for this
-            # one pcap device.  it throws any packets received
-            # into the shared queue (which is read by the actual
-            # user code)
-            pktinfo = pcapdev.recv_packet(timeout=0.2)
-            if pktinfo is None:
+            # one pcap device.  it throws any batches of packets
+            # received into the shared queue (which is read by the
+            # actual user code).  receiving and enqueueing packets in
+            # batches amortizes both the kernel crossings and the
+            # queue locking over up to 64 packets.
+            batch = recv_batch(max_packets=64, timeout=0.2)
+            if not batch:
                 continue
-            pktqueue.put( (devname,pcapdev.dlt,pktinfo) )
+            enqueue( (devname,decoder,batch) )
 
         log_debug("Receiver thread for {} exiting".format(devname))
         stats = pcapdev.stats()
@@ -203,29 +373,117 @@ class LLNetReal(LLNetBase):
 
         Returns a ReceivedPacket named tuple (timestamp, input_port, packet)
         '''
+        recvbatch = self._recvbatch
+        extend = recvbatch.extend
         while True:
-            try:
-                dev,dlt,pktinfo = self._pktqueue.get(timeout=timeout)
-                if not LLNetReal.running:
+            if not recvbatch:
+                # never block once shutdown has started: with an
+                # empty queue and no timeout, get would hang forever
+                if not self._running:
+                    break
+                # receiver threads enqueue batches of packets; pull
+                # the next batch and unpack it into our local buffer.
+                try:
+                    dev,decoder,batch = self._pktqueue.get(timeout=timeout)
+                except Empty:
+                    if not self._running:
+                        raise Shutdown()
+                    raise NoPackets()
+                if dev is None or not self._running:
+                    # the (None,None,None) sentinel from _sig_handler,
+                    # or the flag flipped while we were blocked
                     break
+                extend((dev,decoder,p) for p in batch or ())
+                # opportunistically drain any other batches that are
+                # already queued, so that subsequent recv_packet calls
+                # are served from the local buffer without touching
+                # the shared queue at all
+                try:
+                    get_nowait = self._pktqueue.get_nowait
+                    while True:
+                        dev,decoder,batch = get_nowait()
+                        if dev is None:
+                            # never swallow the shutdown sentinel; a
+                            # blocking get must not follow it or the
+                            # caller would hang past a SIGINT
+                            break
+                        extend((dev,decoder,p) for p in batch or ())
+                except Empty:
+                    continue
+                break
 
-                decoder = _dlt_to_decoder.get(dlt, None)
-                if decoder is None:
-                    log_warn("Received packet with unparseable encapsulation {}".format(dlt))
+            dev,decoder,pktinfo = recvbatch.popleft()
+            if decoder is None:
+                # warned about at device-open time in _make_pcaps
+                continue
+
+            pkt = decoder(pktinfo.raw)
+            return ReceivedPacket(timestamp=pktinfo.timestamp,
+                input_port=dev, packet=pkt)
+        # shutting down; anything still buffered is discarded
+        recvbatch.clear()
+        raise Shutdown()
+
+    def _recv_packet_single(self, timeout=None):
+        '''
+        Specialized variant of recv_packet, bound in place of it at
+        startup when every open device shares the same decoder (the
+        common all-Ethernet case).  Identical semantics, but the
+        decoder is fixed up front so no per-packet decoder handling
+        remains in the loop.
+        '''
+        decoder = self._single_decoder
+        recvbatch = self._recvbatch
+        extend = recvbatch.extend
+        while True:
+            if not recvbatch:
+                if not self._running:
+                    break
+                try:
+                    dev,_,batch = self._pktqueue.get(timeout=timeout)
+                except Empty:
+                    if not self._running:
+                        raise Shutdown()
+                    raise NoPackets()
+                if dev is None or not self._running:
+                    break
+                extend((dev,p) for p in batch or ())
+                try:
+                    get_nowait = self._pktqueue.get_nowait
+                    while True:
+                        dev,_,batch = get_nowait()
+                        if dev is None:
+                            break
+                        extend((dev,p) for p in batch or ())
+                except Empty:
                     continue
+                break
 
-                pkt = decoder(pktinfo.raw) 
-                return ReceivedPacket(timestamp=pktinfo.timestamp, 
-                    input_port=dev, packet=pkt)
-            except Empty:
-                if not LLNetReal.running:
-                    raise Shutdown()
-                raise NoPackets()
+            dev,pktinfo = recvbatch.popleft()
+            pkt = decoder(pktinfo.raw)
+            return ReceivedPacket(timestamp=pktinfo.timestamp,
+                input_port=dev, packet=pkt)
+        recvbatch.clear()
         raise Shutdown()
 
+    def _resolve_send_intf(self, dev):
+        '''
+        Internal method.  Resolve a device name, number, or Interface
+        object into an (Interface, devname) pair.  Raises ValueError
+        if the device isn't recognized.
+        '''
+        if isinstance(dev, int):
+           dev = self._lookup_devname(dev)
+
+        if isinstance(dev, Interface):
+            return dev, dev.name
+        if dev in self._devinfo:
+            return self.interface_by_name(dev), dev
+        raise ValueError("Unrecognized device name for packet send: {}".format(dev))
+
     def send_packet(self, dev, packet):
         '''
-        Send a Switchyard Packet object on the given device 
+        Send a Switchyard Packet object on the given device
         (string name of device).
 
         Raises ValueError if packet object isn't valid, or device
@@ -235,18 +493,8 @@ class LLNetReal(LLNetBase):
             raise ValueError("No packet object given to send_packet")
         if not isinstance(packet, Packet):
             raise ValueError("Object given to send_packet is not a Packet (it is: {})".format(type(packet)))
- 
-        intf = None
-        if isinstance(dev, int):
-           dev = self._lookup_devname(dev)
 
-        if isinstance(dev, Interface):
-            intf = dev
-            dev = dev.name
-        elif dev in self._devinfo:
-            intf = self.interface_by_name(dev)
-        else:
-            raise ValueError("Unrecognized device name for packet send: {}".format(dev))
+        intf, dev = self._resolve_send_intf(dev)
 
         if intf.iftype == InterfaceType.Loopback:
             pdev = self._localsend.get(dev, None)
@@ -254,9 +502,38 @@ class LLNetReal(LLNetBase):
         else:
             pdev = self._pcaps.get(dev, None)
             rawpkt = packet.to_bytes()
-            log_debug("Sending packet on device {}: {}".format(dev, str(packet)))
+            # str(packet) serializes every header; only pay for it
+            # when a debug message would actually be emitted
+            if debug_enabled():
+                log_debug("Sending packet on device {}: {}".format(dev, str(packet)))
             pdev.send_packet(rawpkt)
 
+    def send_packets(self, dev, packets):
+        '''
+        Send a sequence of Switchyard Packet objects on the given
+        device (string name of device).  The device is resolved and
+        validated once for the whole sequence, so bulk emission
+        avoids the per-packet lookup overhead of repeated
+        send_packet calls.
+
+        Raises ValueError if a packet object isn't valid, or device
+        name isn't recognized.
+        '''
+        intf, dev = self._resolve_send_intf(dev)
+        isloop = intf.iftype == InterfaceType.Loopback
+        if isloop:
+            pdev = self._localsend.get(dev, None)
+        else:
+            pdev = self._pcaps.get(dev, None)
+
+        for packet in packets:
+            if not isinstance(packet, Packet):
+                raise ValueError("Object given to send_packets is not a Packet (it is: {})".format(type(packet)))
+            if isloop:
+                pdev.send_packet(packet)
+            else:
+                pdev.send_packet(packet.to_bytes())
+
 def main_real(usercode, netobj, options):
     '''
     Entrypoint function for non-test ("real") mode.  At this point
@@ -330,12 +607,19 @@ class _RawSocket(object):
         try:
             raw,addrinfo = self._sock.recvfrom(1500)
             xlen = len(raw)
-            log_debug("{}: received {} bytes from {} on raw".format(self._name, xlen, addrinfo))
+            if debug_enabled():
+                log_debug("{}: received {} bytes from {} on raw".format(self._name, xlen, addrinfo))
             return PcapPacket(now(), xlen, xlen, raw)
         except Exception as e:
             log_warn("{}: error receiving {}".format(self._name, str(e)))
             return None
 
+    def recv_packet_batch(self, max_packets=64, timeout=None):
+        pktinfo = self.recv_packet(timeout)
+        if pktinfo is None:
+            return []
+        return [pktinfo]
+
     def send_packet(self, packet):
         n = packet.num_headers()
         if n == 0:
@@ -72,7 +72,7 @@ class _PcapFfi(object):
     and PcapLiveDevice classes, below.
     '''
     _instance = None
-    __slots__ = ['_ffi', '_libpcap','_interfaces','_windoze']
+    __slots__ = ['_ffi', '_libpcap','_interfaces','_namebytes','_windoze']
 
     def __init__(self):
         '''
@@ -193,6 +193,7 @@ class _PcapFfi(object):
             raise PcapException("Error opening libpcap: {}".format(e))
 
         self._interfaces = []
+        self._namebytes = {}
         self.discoverdevs()
 
     @staticmethod
@@ -221,8 +222,8 @@ class _PcapFfi(object):
         tmp = pintf
         pindex = 0
         while tmp != self._ffi.NULL:
-            xname = self._ffi.string(tmp.name) # "internal name"; still stored as bytes object
-            xname = xname.decode('ascii', 'ignore')
+            rawname = self._ffi.string(tmp.name) # "internal name"; still stored as bytes object
+            xname = rawname.decode('ascii', 'ignore')
 
             if self._windoze:
                 ext_name = "port{}".format(pindex)
@@ -249,6 +250,9 @@ class _PcapFfi(object):
             # if isup and isrunning:
             xif = PcapInterface(ext_name, xname, xdesc, isloop, isup, isrunning)
             self._interfaces.append(xif)
+            # remember the original bytes name so that opening the
+            # device later doesn't need to re-encode the string
+            self._namebytes[ext_name] = rawname
 
             tmp = tmp.next
         self._libpcap.pcap_freealldevs(pintf)
@@ -261,6 +265,13 @@ class _PcapFfi(object):
     def lib(self):
         return self._libpcap
 
+    def internal_name_bytes(self, extname):
+        '''
+        Return the ascii-encoded internal name for a device, as
+        captured at discovery time.
+        '''
+        return self._namebytes.get(extname, None)
+
     @property
     def ffi(self):
         return self._ffi
@@ -401,7 +412,8 @@ class PcapLiveDevice(object):
     '''
     _OpenDevices = {} # objectid -> low-level pcap dev
     _lock = Lock()
-    __slots__ = ['_ffi','_libpcap','_base','_pcapdev','_devname','_fd','_user_callback']
+    __slots__ = ['_ffi','_libpcap','_base','_pcapdev','_devname','_fd',
+                 '_user_callback','_batch','_dispatch_handle']
 
     def __init__(self, device, snaplen=65535, promisc=1, to_ms=100, 
                  filterstr=None, nonblock=True, only_create=False):
@@ -410,6 +422,8 @@ class PcapLiveDevice(object):
         self._libpcap = self._base.lib
         self._fd = None
         self._user_callback = None
+        self._batch = None
+        self._dispatch_handle = self._ffi.new_handle(self)
 
         errbuf = self._ffi.new("char []", 128)
         internal_name = None
@@ -419,11 +433,14 @@ class PcapLiveDevice(object):
                 break
         if internal_name is None:
             raise Exception("No such device {} exists.".format(device))
+        name_bytes = self._base.internal_name_bytes(device)
+        if name_bytes is None:
+            name_bytes = bytes(internal_name, 'ascii')
         self._devname = device
         self._pcapdev = None
 
         if only_create:
-            pcap = self._libpcap.pcap_create(bytes(internal_name, 'ascii'), errbuf)
+            pcap = self._libpcap.pcap_create(name_bytes, errbuf)
             self._pcapdev = PcapDev(0, 0, 0, _PcapFfi.instance().version, pcap)
             with PcapLiveDevice._lock:
                 PcapLiveDevice._OpenDevices[id(self)] = pcap
@@ -431,7 +448,7 @@ class PcapLiveDevice(object):
                 raise PcapException("Failed to open live device {}: {}".format(internal_name, self._ffi.string(errbuf)))
             return
 
-        pcap = self._libpcap.pcap_open_live(bytes(internal_name, 'ascii'), snaplen, promisc, to_ms, errbuf)
+        pcap = self._libpcap.pcap_open_live(name_bytes, snaplen, promisc, to_ms, errbuf)
         if pcap == self._ffi.NULL:
             raise PcapException("Failed to open live device {}: {}".format(internal_name, self._ffi.string(errbuf)))
 
@@ -601,7 +618,12 @@ class PcapLiveDevice(object):
 
     def send_packet(self, xbuffer):
         if not isinstance(xbuffer, bytes):
-            raise PcapException("Packets to be sent via libpcap must be serialized as a bytes object")
+            # accept any buffer-like object (bytearray, memoryview)
+            # without forcing the caller to copy into a bytes object
+            try:
+                xbuffer = self._ffi.from_buffer(xbuffer)
+            except TypeError:
+                raise PcapException("Packets to be sent via libpcap must be serialized as a bytes object") from None
         xlen = len(xbuffer)
         rv = self._libpcap.pcap_sendpacket(self._pcapdev.pcap, xbuffer, xlen)
         if rv == 0:
@@ -629,11 +651,66 @@ class PcapLiveDevice(object):
     def breakloop(self):
         self._libpcap.pcap_breakloop(self._pcapdev.pcap)
 
+    def recv_packet_batch(self, max_packets=64, timeout=None):
+        '''
+        Receive up to max_packets packets with (at most) one blocking
+        wait.  Blocks for up to timeout seconds until at least one
+        packet is available, then collects any additional packets that
+        can be had without blocking, up to max_packets.  Returns a
+        (possibly empty) list of PcapPacket tuples.
+        '''
+        if timeout is not None and timeout < 0:
+            timeout = None
+
+        batch = []
+        if timeout == 0 and self._pcapdev.nonblock:
+            # polling call on a non-blocking handle (e.g., from the
+            # selector dispatcher, which already knows the device is
+            # readable): go straight to dispatch, no select syscall
+            pass
+        elif self._fd is not None and self._fd >= 0:
+            try:
+                xread,xwrite,xerr = select([self._fd], [], [self._fd], timeout)
+            except:
+                return batch
+            if not xread:
+                return batch
+        else:
+            pkt = self.recv_packet(timeout)
+            if pkt is None:
+                return batch
+            batch.append(pkt)
+            if not self._pcapdev.nonblock:
+                return batch
+
+        # the device has something for us.  let libpcap's C-level
+        # dispatch loop collect the packets rather than making one
+        # pcap_next_ex round trip through the interpreter per packet;
+        # _pcap_batch_callback just appends each one to our list.
+        self._batch = batch
+        rv = self._libpcap.pcap_dispatch(self._pcapdev.pcap,
+            max_packets - len(batch), _pcap_batch_callback,
+            self._dispatch_handle)
+        self._batch = None
+        if rv == -1:
+            s = self._ffi.string(self._libpcap.pcap_geterr(self._pcapdev.pcap))
+            raise PcapException("Error receiving packets: {}".format(s))
+        return batch
+
     def recv_packet(self, timeout):
         # FIXME: ugly and long
         if timeout is None or timeout < 0:
             timeout = None
 
+        if self._pcapdev.nonblock:
+            # poll the handle directly first; while traffic is
+            # flowing this returns a packet without paying for a
+            # select syscall, and we only fall through to the
+            # select-and-wait path when the handle is dry
+            pkt = self._base._recv_packet(self._pcapdev.pcap)
+            if pkt is not None or timeout == 0:
+                return pkt
+
         if self._fd >= 0:
             try:
                 xread,xwrite,xerr = select([self._fd], [], [self._fd], timeout)
@@ -707,6 +784,27 @@ def _pcap_callback(handle, phdr, pdata):
     pcapobj._callback(pkt)
 
 
+@xffi.callback("void(*)(unsigned char *, const struct pcap_pkthdr *, const unsigned char *)")
+def _pcap_batch_callback(handle, phdr, pdata):
+    '''
+    Callback for recv_packet_batch: does the minimum per-packet work
+    (copy out of the pcap buffer and a namedtuple allocation) and
+    appends to the batch list of the device being dispatched.
+    '''
+    xhandle = xffi.cast("void *", handle)
+    pcapobj = xffi.from_handle(xhandle)
+    # the copy into bytes is required, not waste: pdata points into
+    # libpcap's own buffer and is only valid for the duration of this
+    # callback, while the batch entries outlive the dispatch call and
+    # are parsed later by user code.  Handing out a memoryview into a
+    # reused buffer here would let libpcap overwrite packets behind
+    # the parser's back.
+    rawpkt = bytes(xffi.buffer(pdata, phdr[0].caplen))
+    usec = int(xffi.cast("int", phdr[0].tv_usec))
+    ts = phdr[0].tv_sec + usec / 1000000
+    pcapobj._batch.append(PcapPacket(ts, phdr[0].caplen, phdr[0].len, rawpkt))
+
+
 if __name__ == '__main__':
     print ("Found devices: ")
     for dev in pcap_devices():
@@ -11,7 +11,7 @@ from switchyard.llnettest import LLNetTest, _prepare_debugger
 from switchyard.llnetreal import LLNetReal, _RawSocket
 from switchyard.llnetbase import LLNetBase
 import switchyard.llnetreal as llreal
-from switchyard.pcapffi import Dlt, PcapStats, PcapException
+from switchyard.pcapffi import Dlt, PcapStats, PcapPacket, PcapException
 from socket import error as sockerr
 
 class WrapLLNet(LLNetReal):
@@ -92,6 +92,22 @@ class LLNetDevTests(unittest.TestCase):
             self.real.send_packet(intf, p)
             self.real._pcaps.get.assert_called_with(intf.name, None)
 
+    def testRealSendPackets(self):
+        pkts = [Packet(), Packet()]
+        for d,intf in self.real.devinfo.items():
+            self.real.send_packets(intf, pkts)
+            self.real._pcaps.get.assert_called_with(intf.name, None)
+        with self.assertRaises(ValueError):
+            self.real.send_packets("baddev", pkts)
+        for d,intf in self.real.devinfo.items():
+            with self.assertRaises(ValueError):
+                self.real.send_packets(intf, [b'\xde\xad'])
+
+    def testFakeSendPackets(self):
+        pkts = [Packet(), Packet()]
+        self.fake.send_packets("eth1", pkts)
+        self.ev.match.assert_called_with(SwitchyardTestEvent.EVENT_OUTPUT, device='eth1', packet=pkts[-1])
+
     def testFakeCallback(self):
         called = (None,None)
 
@@ -189,9 +205,144 @@ class LLNetDevTests(unittest.TestCase):
         with self.assertRaises(Shutdown):
             lr.recv_packet()
 
-        lr = LLNetReal(['en0'], "testy") 
+        lr = LLNetReal(['en0'], "testy")
         lr.shutdown()
-        self.assertFalse(LLNetReal.running)
+        self.assertFalse(lr.running)
+
+    def testRealRecvBatch(self):
+        from collections import deque
+        from switchyard.lib._ring import MPSCQueue
+        self.real._pktqueue = MPSCQueue()
+        self.real._recvbatch = deque()
+        self.real._running = True
+
+        raw = (Ethernet(ethertype=EtherType.ARP) + Arp()).to_bytes()
+        decoder = llreal._decoder_for_dlt(Dlt.DLT_EN10MB)
+        batch = [PcapPacket(1.0, len(raw), len(raw), raw),
+                 PcapPacket(2.0, len(raw), len(raw), raw)]
+        self.real._pktqueue.put( ('en0', decoder, batch) )
+        self.real._pktqueue.put( ('en1', decoder,
+                                  [PcapPacket(3.0, len(raw), len(raw), raw)]) )
+
+        rp = self.real.recv_packet(timeout=1.0)
+        self.assertEqual(rp.timestamp, 1.0)
+        self.assertEqual(rp.input_port, 'en0')
+        rp = self.real.recv_packet(timeout=1.0)
+        self.assertEqual(rp.timestamp, 2.0)
+        # the second batch should have been drained into the local
+        # buffer along with the first
+        self.assertTrue(self.real._pktqueue.empty())
+        rp = self.real.recv_packet(timeout=1.0)
+        self.assertEqual(rp.timestamp, 3.0)
+        self.assertEqual(rp.input_port, 'en1')
+        with self.assertRaises(NoPackets):
+            self.real.recv_packet(timeout=0.1)
+
+    def testRecvShutdownSentinel(self):
+        from collections import deque
+        from switchyard.lib._ring import MPSCQueue
+        self.real._pktqueue = MPSCQueue()
+        self.real._recvbatch = deque()
+        self.real._running = True
+
+        # a real batch immediately followed by the shutdown sentinel,
+        # as happens when SIGINT lands mid-receive; the drain loop
+        # must surface Shutdown rather than swallowing the sentinel
+        # and blocking on the next get
+        raw = (Ethernet(ethertype=EtherType.ARP) + Arp()).to_bytes()
+        decoder = llreal._decoder_for_dlt(Dlt.DLT_EN10MB)
+        self.real._pktqueue.put( ('en0', decoder,
+                                  [PcapPacket(1.0, len(raw), len(raw), raw)]) )
+        self.real._pktqueue.put( (None,None,None) )
+        with self.assertRaises(Shutdown):
+            self.real.recv_packet(timeout=1.0)
+        # the packet batched before the sentinel was discarded along
+        # with the rest of the local buffer
+        self.assertEqual(len(self.real._recvbatch), 0)
+
+        # sentinel arriving alone via the blocking get, both paths
+        self.real._pktqueue.put( (None,None,None) )
+        with self.assertRaises(Shutdown):
+            self.real.recv_packet(timeout=1.0)
+        self.real._single_decoder = decoder
+        self.real._pktqueue.put( (None,None,None) )
+        with self.assertRaises(Shutdown):
+            self.real._recv_packet_single(timeout=1.0)
+
+        # once shutdown has begun, recv_packet must not block on the
+        # empty queue even without a timeout
+        self.real._running = False
+        with self.assertRaises(Shutdown):
+            self.real.recv_packet()
+
+    def testRealRecvSingleDecoder(self):
+        from collections import deque
+        from switchyard.lib._ring import MPSCQueue
+        self.real._pktqueue = MPSCQueue()
+        self.real._recvbatch = deque()
+        self.real._running = True
+        decoder = llreal._decoder_for_dlt(Dlt.DLT_EN10MB)
+        self.real._single_decoder = decoder
+
+        raw = (Ethernet(ethertype=EtherType.ARP) + Arp()).to_bytes()
+        self.real._pktqueue.put( ('en0', decoder,
+                                  [PcapPacket(1.0, len(raw), len(raw), raw),
+                                   PcapPacket(2.0, len(raw), len(raw), raw)]) )
+
+        rp = self.real._recv_packet_single(timeout=1.0)
+        self.assertEqual(rp.timestamp, 1.0)
+        self.assertEqual(rp.input_port, 'en0')
+        self.assertIsInstance(rp.packet[0], Ethernet)
+        rp = self.real._recv_packet_single(timeout=1.0)
+        self.assertEqual(rp.timestamp, 2.0)
+        with self.assertRaises(NoPackets):
+            self.real._recv_packet_single(timeout=0.1)
+
+    def testSelectorDispatch(self):
+        import os
+        from switchyard.lib._ring import MPSCQueue
+        rfd, wfd = os.pipe()
+        os.write(wfd, b'x')
+
+        batch = ['fakepkt']
+        pdev = Mock()
+        pdev.fd = rfd
+        pdev.stats = Mock(return_value=PcapStats(1,0,0))
+        decoder = llreal._decoder_for_dlt(Dlt.DLT_EN10MB)
+
+        def fakebatch(max_packets=64, timeout=None):
+            # stop the dispatch loop after one batch
+            self.real._running = False
+            return batch
+        pdev.recv_packet_batch = Mock(side_effect=fakebatch)
+
+        self.real._pktqueue = MPSCQueue()
+        self.real._decoders = {'en0': decoder}
+        self.real._wakepipe = os.pipe()
+        self.real._running = True
+        self.real._selector_dispatch({'en0': pdev})
+        self.assertEqual(self.real._pktqueue.get(timeout=0),
+                         ('en0', decoder, batch))
+        os.close(rfd)
+        os.close(wfd)
+        for fd in self.real._wakepipe:
+            os.close(fd)
+
+    def testRawSockRecvBatch(self):
+        msock = Mock()
+        sobj = Mock()
+        msock.socket = Mock(return_value=sobj)
+        setattr(llreal, "socket", msock)
+        r = _RawSocket('loop')
+
+        sobj.recvfrom = Mock(return_value=(b'\x01\x02\x03', ('127.0.0.1', 4444)) )
+        batch = r.recv_packet_batch(max_packets=4, timeout=0)
+        self.assertEqual(len(batch), 1)
+
+        sobj.recvfrom = Mock(return_value=None, side_effect=sockerr)
+        with self.assertLogs():
+            batch = r.recv_packet_batch(max_packets=4, timeout=0)
+        self.assertEqual(batch, [])
 
     def testRawSock(self):
         with self.assertRaises(socket.error):
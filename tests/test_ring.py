@@ -0,0 +1,62 @@
+import unittest
+import threading
+from queue import Empty
+
+from switchyard.lib._ring import MPSCQueue
+
+
+class MPSCQueueTests(unittest.TestCase):
+    def testFifoOrder(self):
+        q = MPSCQueue()
+        for i in range(10):
+            q.put(i)
+        self.assertEqual(q.qsize(), 10)
+        self.assertFalse(q.empty())
+        for i in range(10):
+            self.assertEqual(q.get(timeout=0), i)
+        self.assertTrue(q.empty())
+        self.assertEqual(q.qsize(), 0)
+
+    def testEmptyTimeout(self):
+        q = MPSCQueue()
+        with self.assertRaises(Empty):
+            q.get(timeout=0.05)
+
+    def testBlockingGet(self):
+        q = MPSCQueue()
+
+        def producer():
+            q.put("hello")
+
+        t = threading.Timer(0.05, producer)
+        t.start()
+        self.assertEqual(q.get(timeout=1.0), "hello")
+        t.join()
+
+    def testManyProducers(self):
+        q = MPSCQueue()
+        numthreads = 4
+        peritem = 100
+
+        def producer(tid):
+            for i in range(peritem):
+                q.put((tid, i))
+
+        threads = [threading.Thread(target=producer, args=(tid,))
+                   for tid in range(numthreads)]
+        for t in threads:
+            t.start()
+
+        lastseen = [-1] * numthreads
+        for _ in range(numthreads * peritem):
+            tid, i = q.get(timeout=1.0)
+            # items from any one producer must arrive in order
+            self.assertEqual(i, lastseen[tid] + 1)
+            lastseen[tid] = i
+        for t in threads:
+            t.join()
+        self.assertTrue(q.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()